@@ -2,37 +2,79 @@
 Parses EPUB/PDF files into a structured object for the local reader web interface.
 """
 
+import dataclasses
+import json
+import mmap
 import os
 import posixpath
 import pickle
 import shutil
+import struct
 import time
+import unicodedata
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple, Callable
 from datetime import datetime
 from urllib.parse import unquote
 from html import escape
 import re
+import warnings
 
 import ebooklib
 from ebooklib import epub
-from bs4 import BeautifulSoup, Comment
+from bs4 import BeautifulSoup, Comment, FeatureNotFound, XMLParsedAsHTMLWarning
 from pypdf import PdfReader
 
+# EPUB chapters are XHTML; parsing them as HTML is intentional.
+warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
+
+# Anything but (Unicode) letters, digits, '_', '.' and '-' is dropped from image filenames.
+_UNSAFE_FNAME_RE = re.compile(r"[^\w.-]+")
+
+# PDF text normalization / outline heuristics
+_HYPHEN_BREAK_RE = re.compile(r"([A-Za-z])[-\u2010\u2011\u00AD]\s*\n\s*([A-Za-z])")
+_TERMINATORS = frozenset(".!?:;)")
+_CHAPTER_LIKE_RE = re.compile(
+    r"\b(chapter|chap\.|prologue|epilogue|appendix)\b", re.IGNORECASE
+)
+_PART_LIKE_RE = re.compile(r"\b(part|book|section)\b", re.IGNORECASE)
+
 # --- Data structures ---
 
 @dataclass
-class ChapterContent:
+class ChapterMeta:
     """
     Represents a physical file in the EPUB (Spine Item).
     A single file might contain multiple logical chapters (TOC entries).
+    The heavy HTML/text lives in the parallel ChapterBody, stored in bodies.bin.
     """
     id: str           # Internal ID (e.g., 'item_1')
     href: str         # Filename (e.g., 'part01.html')
     title: str        # Best guess title from file
+    order: int        # Linear reading order
+
+
+@dataclass
+class ChapterBody:
+    """Content of a spine item, loaded on demand via load_chapter_body()."""
     content: str      # Cleaned HTML with rewritten image paths
     text: str         # Plain text for search/LLM context
-    order: int        # Linear reading order
+
+
+@dataclass
+class ChapterContent:
+    """
+    Legacy spine item (meta + body in one object).
+    Only kept so books pickled before bodies.bin existed can still be loaded.
+    """
+    id: str
+    href: str
+    title: str
+    content: str
+    text: str
+    order: int
 
 
 @dataclass
@@ -62,37 +104,52 @@ class BookMetadata:
 class Book:
     """The Master Object to be pickled."""
     metadata: BookMetadata
-    spine: List[ChapterContent]  # The actual content (linear files)
+    spine: List[ChapterMeta]     # The linear files (metadata only)
     toc: List[TOCEntry]          # The navigation tree
     images: Dict[str, str]       # Map: original_path -> local_path
 
     # Meta info
     source_file: str
     processed_at: str
-    version: str = "3.0"
+    version: str = "4.0"
+
+    # Random id shared with the bodies.bin written alongside this book.pkl,
+    # so a reprocessed bodies.bin is never read against a stale spine.
+    bodies_id: str = ""
+
+    # Parallel to spine. Written to bodies.bin rather than book.pkl, so a
+    # loaded Book has this empty and reads chapters via load_chapter_body().
+    bodies: List[ChapterBody] = field(default_factory=list)
 
 
 # --- Utilities ---
 
+def parse_html(raw_content: str) -> BeautifulSoup:
+    """Parse chapter HTML with lxml, falling back to the stdlib parser if unavailable."""
+    try:
+        return BeautifulSoup(raw_content, 'lxml')
+    except FeatureNotFound:
+        return BeautifulSoup(raw_content, 'html.parser')
+
+
 def clean_html_content(soup: BeautifulSoup) -> BeautifulSoup:
 
-    # Remove dangerous/useless tags
-    for tag in soup(['script', 'style', 'iframe', 'video', 'nav', 'form', 'button']):
+    # Remove dangerous/useless tags (including inputs) in a single tree walk
+    for tag in soup.find_all(['script', 'style', 'iframe', 'video', 'nav', 'form', 'button', 'input']):
         tag.decompose()
 
     # Remove HTML comments
     for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
         comment.extract()
 
-    # Remove input tags
-    for tag in soup.find_all('input'):
-        tag.decompose()
-
     return soup
 
 
 def extract_plain_text(soup: BeautifulSoup) -> str:
     """Extract clean text for LLM/Search usage."""
+    # BeautifulSoup builds its own tree even on the lxml backend, so there is no
+    # lxml element to itertext() over; re-parsing with lxml or collapsing with a
+    # regex both measured slower than get_text + str.split on large chapters.
     text = soup.get_text(separator=' ')
     # Collapse whitespace
     return ' '.join(text.split())
@@ -140,6 +197,11 @@ def prepare_output_dir(output_dir: str) -> str:
     return images_dir
 
 
+def _write_file(path: str, data: bytes):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
 def text_to_html(text: str) -> str:
     """Convert plain text into simple paragraph HTML."""
     lines = [line.strip() for line in text.splitlines() if line.strip()]
@@ -148,6 +210,16 @@ def text_to_html(text: str) -> str:
     return "".join(f"<p>{escape(line)}</p>" for line in lines)
 
 
+def _is_bullet_line(line: str) -> bool:
+    """True for lines starting with "- ", "* ", "1. " or "1) " (line is pre-stripped)."""
+    if line[0] in "-*":
+        return len(line) > 1 and line[1].isspace()
+    i = 0
+    while i < len(line) and line[i].isdecimal():
+        i += 1
+    return 0 < i < len(line) - 1 and line[i] in ".)" and line[i + 1].isspace()
+
+
 def normalize_pdf_text(text: str) -> str:
     """
     Normalize common PDF extraction artifacts while preserving paragraph boundaries.
@@ -156,78 +228,72 @@ def normalize_pdf_text(text: str) -> str:
         return ""
 
     normalized = text.replace("\r\n", "\n").replace("\r", "\n")
+    # Canonicalize compatibility forms (ligatures, fullwidth digits, ...) first
+    # so the rules below see plain characters.
+    normalized = unicodedata.normalize("NFKC", normalized)
 
     # Merge words split by line-break hyphenation: "serv-\nices" -> "services"
-    normalized = re.sub(r"([A-Za-z])[-\u2010\u2011\u00AD]\s*\n\s*([A-Za-z])", r"\1\2", normalized)
+    normalized = _HYPHEN_BREAK_RE.sub(r"\1\2", normalized)
 
     # Join single newlines inside paragraphs; keep blank-line paragraph breaks.
-    lines = normalized.split("\n")
+    # Fragments of the line being built are buffered and joined once on flush,
+    # so long wrapped paragraphs don't rebuild the same string per line.
     rebuilt: List[str] = []
-    for line in lines:
+    fragments: List[str] = []
+    for line in normalized.split("\n"):
         stripped = line.strip()
         if not stripped:
-            rebuilt.append("")
-            continue
-        if not rebuilt or rebuilt[-1] == "":
-            rebuilt.append(stripped)
+            if fragments:
+                rebuilt.append(" ".join(fragments))
+                fragments = []
+            # Compress repeated blank lines.
+            if rebuilt and rebuilt[-1] != "":
+                rebuilt.append("")
             continue
 
-        prev = rebuilt[-1]
-        # Start a new line for list-like/bullet-like content.
-        if re.match(r"^([-*]|\d+[.)])\s", stripped):
-            rebuilt.append(stripped)
+        # Continue paragraph when previous line does not clearly terminate,
+        # but start a new line for list-like/bullet-like content.
+        if fragments and fragments[-1][-1] not in _TERMINATORS and not _is_bullet_line(stripped):
+            fragments.append(stripped)
             continue
-        # Continue paragraph when previous line does not clearly terminate.
-        if not re.search(r"[.!?:;)]$", prev):
-            rebuilt[-1] = f"{prev} {stripped}"
-        else:
-            rebuilt.append(stripped)
-
-    # Compress repeated blank lines.
-    compact: List[str] = []
-    for line in rebuilt:
-        if line == "" and compact and compact[-1] == "":
-            continue
-        compact.append(line)
 
-    return "\n".join(compact).strip()
+        if fragments:
+            rebuilt.append(" ".join(fragments))
+        fragments = [stripped]
+
+    if fragments:
+        rebuilt.append(" ".join(fragments))
+
+    return "\n".join(rebuilt).strip()
 
 
-def parse_toc_recursive(toc_list, depth=0) -> List[TOCEntry]:
+def _toc_entry(title, href: str) -> TOCEntry:
+    file_href, _, anchor = href.partition('#')
+    return TOCEntry(title=title, href=href, file_href=file_href, anchor=anchor)
+
+
+def parse_toc(toc_list) -> List[TOCEntry]:
     """
-    Recursively parses the TOC structure from ebooklib.
+    Parses the (nested) TOC structure from ebooklib.
+    Walks the tree with an explicit stack instead of recursing per level.
     """
-    result = []
-
-    for item in toc_list:
-        # ebooklib TOC items are either `Link` objects or tuples (Section, [Children])
-        if isinstance(item, tuple):
-            section, children = item
-            entry = TOCEntry(
-                title=section.title,
-                href=section.href,
-                file_href=section.href.split('#')[0],
-                anchor=section.href.split('#')[1] if '#' in section.href else "",
-                children=parse_toc_recursive(children, depth + 1)
-            )
-            result.append(entry)
-        elif isinstance(item, epub.Link):
-            entry = TOCEntry(
-                title=item.title,
-                href=item.href,
-                file_href=item.href.split('#')[0],
-                anchor=item.href.split('#')[1] if '#' in item.href else ""
-            )
-            result.append(entry)
-        # Note: ebooklib sometimes returns direct Section objects without children
-        elif isinstance(item, epub.Section):
-             entry = TOCEntry(
-                title=item.title,
-                href=item.href,
-                file_href=item.href.split('#')[0],
-                anchor=item.href.split('#')[1] if '#' in item.href else ""
-            )
-             result.append(entry)
+    result: List[TOCEntry] = []
+    stack = [(toc_list, result)]
+
+    while stack:
+        items, out = stack.pop()
+        for item in items:
+            # ebooklib TOC items are either `Link` objects or tuples (Section, [Children])
+            if isinstance(item, tuple):
+                section, children = item
+                entry = _toc_entry(section.title, section.href)
+                out.append(entry)
+                stack.append((children, entry.children))
+            elif isinstance(item, epub.Link):
+                out.append(_toc_entry(item.title, item.href))
+            # Note: ebooklib sometimes returns direct Section objects without children
+            elif isinstance(item, epub.Section):
+                out.append(_toc_entry(item.title, item.href))
 
     return result
 
@@ -270,6 +336,69 @@ def extract_metadata_robust(book_obj) -> BookMetadata:
     )
 
 
+def _process_spine_item(args) -> Tuple[ChapterMeta, ChapterBody]:
+    """
+    Parse, clean and extract a single spine document.
+    Top-level (picklable) so process_epub can dispatch it to worker processes.
+    """
+    i, item_id, raw_content_bytes, item_name, image_map = args
+
+    # Raw content
+    raw_content = raw_content_bytes.decode('utf-8', errors='ignore')
+    soup = parse_html(raw_content)
+
+    # A. Fix Images
+    chapter_dir = posixpath.dirname(normalize_epub_path(item_name))
+    for img in soup.find_all('img'):
+        src = img.get('src', '')
+        if not src: continue
+
+        # Fast path: most src attributes match an image_map key verbatim.
+        local = image_map.get(src)
+        if local:
+            img['src'] = local
+            continue
+
+        src_norm = normalize_epub_path(src)
+
+        candidates = []
+        if src_norm:
+            candidates.append(src_norm)
+            if chapter_dir:
+                resolved = normalize_epub_path(posixpath.join(chapter_dir, src_norm))
+                if resolved:
+                    candidates.append(resolved)
+            filename = posixpath.basename(src_norm)
+            if filename:
+                candidates.append(filename)
+
+        for candidate in candidates:
+            if candidate in image_map:
+                img['src'] = image_map[candidate]
+                break
+
+    # B. Clean HTML
+    soup = clean_html_content(soup)
+
+    # C. Extract Body Content only
+    body = soup.find('body')
+    if body:
+        # Extract inner HTML of body in a single serialization pass
+        final_html = body.decode_contents()
+    else:
+        final_html = str(soup)
+
+    # D. Create Objects
+    chapter = ChapterMeta(
+        id=item_id,
+        href=item_name, # Important: This links TOC to Content
+        title=f"Section {i+1}", # Fallback, real titles come from TOC
+        order=i
+    )
+    body = ChapterBody(content=final_html, text=extract_plain_text(soup))
+    return chapter, body
+
+
 # --- Main Conversion Logic ---
 
 def process_epub(epub_path: str, output_dir: str) -> Book:
@@ -291,6 +420,7 @@ def process_epub(epub_path: str, output_dir: str) -> Book:
     # 4. Extract Images & Build Map
     print("Extracting images...")
     image_map = {} # Key: internal_path, Value: local_relative_path
+    image_files: Dict[str, bytes] = {} # Key: local_path, Value: image bytes
 
     image_types = {ebooklib.ITEM_IMAGE}
     if hasattr(ebooklib, "ITEM_COVER"):
@@ -302,35 +432,42 @@ def process_epub(epub_path: str, output_dir: str) -> Book:
             internal_name = normalize_epub_path(item.get_name())
             original_fname = posixpath.basename(internal_name)
             # Sanitize filename for OS
-            safe_fname = "".join([c for c in original_fname if c.isalpha() or c.isdigit() or c in '._-']).strip()
+            safe_fname = _UNSAFE_FNAME_RE.sub('', original_fname).strip()
             if not safe_fname:
                 safe_fname = "image.bin"
 
-            # Save to disk
+            # Queue for writing; same-named images keep the last one, as before
             local_path = os.path.join(images_dir, safe_fname)
-            with open(local_path, 'wb') as f:
-                f.write(item.get_content())
+            image_files[local_path] = item.get_content()
 
             # Map keys: We try both the full internal path and just the basename
             # to be robust against messy HTML src attributes
             rel_path = f"images/{safe_fname}"
             image_map[item.get_name()] = rel_path
+            image_map[unquote(item.get_name())] = rel_path
             image_map[internal_name] = rel_path
             image_map[f"./{internal_name}"] = rel_path
             image_map[original_fname] = rel_path
 
+    # Overlap the (small, many) image writes instead of doing them one by one.
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        futures = [ex.submit(_write_file, path, data) for path, data in image_files.items()]
+        for future in futures:
+            future.result()
+
     # 5. Process TOC
     print("Parsing Table of Contents...")
-    toc_structure = parse_toc_recursive(book.toc)
+    toc_structure = parse_toc(book.toc)
     if not toc_structure:
         print("Warning: Empty TOC, building fallback from Spine...")
         toc_structure = get_fallback_toc(book)
 
     # 6. Process Content (Spine-based to preserve HTML validity)
     print("Processing chapters...")
-    spine_chapters = []
 
-    # We iterate over the spine (linear reading order)
+    # We iterate over the spine (linear reading order); reading the raw bytes is
+    # cheap since the archive is already in memory, so only parsing is farmed out.
+    spine_args = []
     for i, spine_item in enumerate(book.spine):
         item_id, linear = spine_item
         item = book.get_item_with_id(item_id)
@@ -339,56 +476,19 @@ def process_epub(epub_path: str, output_dir: str) -> Book:
             continue
 
         if item.get_type() == ebooklib.ITEM_DOCUMENT:
-            # Raw content
-            raw_content = item.get_content().decode('utf-8', errors='ignore')
-            soup = BeautifulSoup(raw_content, 'html.parser')
-
-            # A. Fix Images
-            for img in soup.find_all('img'):
-                src = img.get('src', '')
-                if not src: continue
-
-                src_norm = normalize_epub_path(src)
-                chapter_href = normalize_epub_path(item.get_name())
-                chapter_dir = posixpath.dirname(chapter_href)
-
-                candidates = []
-                if src_norm:
-                    candidates.append(src_norm)
-                    if chapter_dir:
-                        resolved = normalize_epub_path(posixpath.join(chapter_dir, src_norm))
-                        if resolved:
-                            candidates.append(resolved)
-                    filename = posixpath.basename(src_norm)
-                    if filename:
-                        candidates.append(filename)
-
-                for candidate in candidates:
-                    if candidate in image_map:
-                        img['src'] = image_map[candidate]
-                        break
-
-            # B. Clean HTML
-            soup = clean_html_content(soup)
-
-            # C. Extract Body Content only
-            body = soup.find('body')
-            if body:
-                # Extract inner HTML of body
-                final_html = "".join([str(x) for x in body.contents])
-            else:
-                final_html = str(soup)
-
-            # D. Create Object
-            chapter = ChapterContent(
-                id=item_id,
-                href=item.get_name(), # Important: This links TOC to Content
-                title=f"Section {i+1}", # Fallback, real titles come from TOC
-                content=final_html,
-                text=extract_plain_text(soup),
-                order=i
-            )
-            spine_chapters.append(chapter)
+            spine_args.append((i, item_id, item.get_content(), item.get_name(), image_map))
+
+    # Chapters are independent, so parse them across processes.
+    # Executor.map preserves input order, keeping spine_chapters in reading order.
+    if len(spine_args) > 1:
+        # Every task ships the full image_map, so don't spawn idle workers.
+        workers = min(os.cpu_count() or 1, len(spine_args))
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            processed = list(ex.map(_process_spine_item, spine_args))
+    else:
+        processed = [_process_spine_item(args) for args in spine_args]
+    spine_chapters = [chapter for chapter, _ in processed]
+    bodies = [body for _, body in processed]
 
     # 7. Final Assembly
     final_book = Book(
@@ -397,7 +497,8 @@ def process_epub(epub_path: str, output_dir: str) -> Book:
         toc=toc_structure,
         images=image_map,
         source_file=os.path.basename(epub_path),
-        processed_at=datetime.now().isoformat()
+        processed_at=datetime.now().isoformat(),
+        bodies=bodies,
     )
 
     return final_book
@@ -408,11 +509,6 @@ def get_pdf_outline_entries(reader: PdfReader) -> List[Dict[str, Any]]:
     Return outline entries as [{"title": str, "page": int}] sorted by page.
     Selects a bookmark depth that is likely to represent chapter-level sections.
     """
-    chapter_like_re = re.compile(
-        r"\b(chapter|chap\.|prologue|epilogue|appendix)\b", re.IGNORECASE
-    )
-    part_like_re = re.compile(r"\b(part|book|section)\b", re.IGNORECASE)
-
     def as_entry(item, level: int) -> Optional[Dict[str, Any]]:
         title = getattr(item, "title", None)
         if not title:
@@ -472,7 +568,7 @@ def get_pdf_outline_entries(reader: PdfReader) -> List[Dict[str, Any]]:
     # If top-level is mostly "Part/Book/Section", prefer one level deeper.
     top_entries = normalized_by_level.get(0, [])
     if top_entries:
-        part_like_count = sum(1 for e in top_entries if part_like_re.search(e["title"]))
+        part_like_count = sum(1 for e in top_entries if _PART_LIKE_RE.search(e["title"]))
         if part_like_count >= max(2, len(top_entries) // 2):
             if 1 in normalized_by_level and normalized_by_level[1]:
                 return [
@@ -487,7 +583,7 @@ def get_pdf_outline_entries(reader: PdfReader) -> List[Dict[str, Any]]:
         if len(entries) < 3:
             continue
         chapter_like_count = sum(
-            1 for e in entries if chapter_like_re.search(e["title"])
+            1 for e in entries if _CHAPTER_LIKE_RE.search(e["title"])
         )
         ratio = chapter_like_count / len(entries) if entries else 0.0
         score = (chapter_like_count, ratio, len(entries))
@@ -509,6 +605,21 @@ def get_pdf_outline_entries(reader: PdfReader) -> List[Dict[str, Any]]:
     ]
 
 
+# Per-process PdfReader used by _extract_and_normalize in pool workers.
+_pdf_worker_reader: Optional[PdfReader] = None
+
+
+def _init_pdf_worker(pdf_path: str):
+    global _pdf_worker_reader
+    _pdf_worker_reader = PdfReader(pdf_path)
+
+
+def _extract_and_normalize(page_index: int) -> str:
+    """Extract and normalize one page's text (runs in a pool worker)."""
+    page = _pdf_worker_reader.pages[page_index]
+    return normalize_pdf_text(page.extract_text() or "")
+
+
 def process_pdf(pdf_path: str, output_dir: str) -> Book:
     if not pdf_path.lower().endswith(".pdf"):
         raise ValueError(
@@ -538,11 +649,27 @@ def process_pdf(pdf_path: str, output_dir: str) -> Book:
 
     page_texts: List[str] = []
     print("Extracting PDF text...")
-    for page in reader.pages:
-        page_texts.append(normalize_pdf_text(page.extract_text() or ""))
+    page_count = len(reader.pages)
+    if page_count > 1:
+        # Pages are independent; each worker opens its own reader once.
+        # Each worker re-parses the whole PDF, so never start more than there are pages.
+        workers = min(os.cpu_count() or 1, page_count)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_pdf_worker,
+            initargs=(pdf_path,),
+        ) as ex:
+            page_texts = list(ex.map(
+                _extract_and_normalize,
+                range(page_count),
+                chunksize=max(1, page_count // (workers * 4)),
+            ))
+    else:
+        page_texts = [normalize_pdf_text(page.extract_text() or "") for page in reader.pages]
 
     outline_entries = get_pdf_outline_entries(reader)
-    spine_chapters: List[ChapterContent] = []
+    spine_chapters: List[ChapterMeta] = []
+    bodies: List[ChapterBody] = []
     toc_structure: List[TOCEntry] = []
 
     if outline_entries:
@@ -561,13 +688,12 @@ def process_pdf(pdf_path: str, output_dir: str) -> Book:
             href = f"chapter-{i + 1}"
             chapter_title = entry["title"] or f"Chapter {i + 1}"
             spine_chapters.append(
-                ChapterContent(
-                    id=href,
-                    href=href,
-                    title=chapter_title,
+                ChapterMeta(id=href, href=href, title=chapter_title, order=i)
+            )
+            bodies.append(
+                ChapterBody(
                     content=text_to_html(segment_text),
                     text=" ".join(segment_text.split()),
-                    order=i,
                 )
             )
             toc_structure.append(
@@ -584,13 +710,12 @@ def process_pdf(pdf_path: str, output_dir: str) -> Book:
             href = f"page-{i + 1}"
             page_title = f"Page {i + 1}"
             spine_chapters.append(
-                ChapterContent(
-                    id=href,
-                    href=href,
-                    title=page_title,
+                ChapterMeta(id=href, href=href, title=page_title, order=i)
+            )
+            bodies.append(
+                ChapterBody(
                     content=text_to_html(page_text),
                     text=" ".join(page_text.split()),
-                    order=i,
                 )
             )
             toc_structure.append(
@@ -608,7 +733,8 @@ def process_pdf(pdf_path: str, output_dir: str) -> Book:
         toc=toc_structure,
         images={},
         source_file=os.path.basename(pdf_path),
-        processed_at=datetime.now().isoformat()
+        processed_at=datetime.now().isoformat(),
+        bodies=bodies,
     )
     return final_book
 
@@ -624,18 +750,56 @@ def process_book(input_path: str, output_dir: str) -> Book:
     )
 
 
-def save_to_pickle(book: Book, output_dir: str):
-    p_path = os.path.join(output_dir, 'book.pkl')
-    os.makedirs(output_dir, exist_ok=True)
+# bodies.bin layout: bodies_id (16 bytes) and chapter count, then one
+# (content offset, content length, text offset, text length) entry per
+# chapter, then the UTF-8 blobs.
+_BODIES_HEADER = struct.Struct('<16sQ')
+_BODIES_ENTRY = struct.Struct('<QQQQ')
+
+
+def _dump_book(book: Book, path: str):
+    """Pickle with the newest protocol through a large write buffer."""
+    with open(path, 'wb', buffering=1 << 20) as f:
+        pickle.dump(book, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _dump_bodies(bodies: List[ChapterBody], bodies_id: str, path: str):
+    blobs: List[bytes] = []
+    for body in bodies:
+        blobs.append(body.content.encode('utf-8'))
+        blobs.append(body.text.encode('utf-8'))
+
+    offset = _BODIES_HEADER.size + _BODIES_ENTRY.size * len(bodies)
+    spans: List[int] = []
+    for blob in blobs:
+        spans.extend((offset, len(blob)))
+        offset += len(blob)
+
+    with open(path, 'wb', buffering=1 << 20) as f:
+        f.write(_BODIES_HEADER.pack(bytes.fromhex(bodies_id), len(bodies)))
+        for i in range(len(bodies)):
+            f.write(_BODIES_ENTRY.pack(*spans[i * 4:i * 4 + 4]))
+        for blob in blobs:
+            f.write(blob)
 
-    tmp_path = p_path + ".tmp"
-    with open(tmp_path, 'wb') as f:
-        pickle.dump(book, f)
+
+def _dump_json(data: Any, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def _write_replacing(path: str, write: Callable[[str], None]):
+    """
+    Write to a temp file and swap it in, retrying on transient lock errors.
+    Falls back to writing in place if the swap keeps failing.
+    """
+    tmp_path = path + ".tmp"
+    write(tmp_path)
 
     last_error: Optional[Exception] = None
     for _ in range(5):
         try:
-            os.replace(tmp_path, p_path)
+            os.replace(tmp_path, path)
             last_error = None
             break
         except PermissionError as e:
@@ -643,13 +807,77 @@ def save_to_pickle(book: Book, output_dir: str):
             time.sleep(0.25)
 
     if last_error is not None:
-        with open(p_path, 'wb') as f:
-            pickle.dump(book, f)
+        write(path)
         if os.path.exists(tmp_path):
             try:
                 os.remove(tmp_path)
             except OSError:
                 pass
+
+
+def load_chapter_body(book: Book, book_dir: str, index: int) -> Optional[ChapterBody]:
+    """
+    Read a single chapter's content/text.
+    Only the requested slice of bodies.bin is decoded. Returns None if the
+    chapter is missing or bodies.bin belongs to a different book.pkl (the
+    book was reprocessed after `book` was loaded).
+    """
+    chapter = book.spine[index]
+    if getattr(chapter, "content", None) is not None:
+        # Legacy book.pkl with content stored inline.
+        return ChapterBody(content=chapter.content, text=chapter.text)
+    bodies = getattr(book, "bodies", None)
+    if bodies:
+        return bodies[index]
+
+    bodies_path = os.path.join(book_dir, 'bodies.bin')
+    if not os.path.exists(bodies_path):
+        return None
+    with open(bodies_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            bodies_id, count = _BODIES_HEADER.unpack_from(mm, 0)
+            if bodies_id.hex() != getattr(book, "bodies_id", "") or index >= count:
+                return None
+            c_off, c_len, t_off, t_len = _BODIES_ENTRY.unpack_from(
+                mm, _BODIES_HEADER.size + index * _BODIES_ENTRY.size
+            )
+            return ChapterBody(
+                content=mm[c_off:c_off + c_len].decode('utf-8'),
+                text=mm[t_off:t_off + t_len].decode('utf-8'),
+            )
+
+
+def save_library_meta(book: Book, output_dir: str) -> Dict[str, Any]:
+    """
+    Write the small library.json sidecar so the library page can list books
+    without unpickling them. Returns the written metadata.
+    """
+    meta = {
+        "title": book.metadata.title,
+        "authors": book.metadata.authors,
+        "chapters": len(book.spine),
+    }
+    # Swapped in via os.replace: readers never see a half-written file, and the
+    # directory mtime changes, which invalidates the server's library cache.
+    meta_path = os.path.join(output_dir, 'library.json')
+    _write_replacing(meta_path, lambda path: _dump_json(meta, path))
+    return meta
+
+
+def save_to_pickle(book: Book, output_dir: str):
+    p_path = os.path.join(output_dir, 'book.pkl')
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Bodies first, so a new book.pkl is never paired with a missing bodies.bin.
+    bodies_id = uuid.uuid4().hex
+    bodies_path = os.path.join(output_dir, 'bodies.bin')
+    _write_replacing(bodies_path, lambda path: _dump_bodies(book.bodies, bodies_id, path))
+
+    # book.pkl holds only metadata, spine and TOC.
+    meta_book = dataclasses.replace(book, bodies=[], bodies_id=bodies_id)
+    _write_replacing(p_path, lambda path: _dump_book(meta_book, path))
+
+    save_library_meta(book, output_dir)
     print(f"Saved structured data to {p_path}")
 
 
@@ -1,16 +1,30 @@
+import json
+import mmap
 import os
 import pickle
 import re
 import shutil
+import threading
+from collections import OrderedDict
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-
-from reader4 import Book, BookMetadata, ChapterContent, TOCEntry
+from starlette.concurrency import run_in_threadpool
+
+from reader4 import (
+    Book,
+    BookMetadata,
+    ChapterBody,
+    ChapterContent,
+    ChapterMeta,
+    TOCEntry,
+    load_chapter_body,
+    save_library_meta,
+)
 
 app = FastAPI()
 templates = Jinja2Templates(directory="templates")
@@ -23,6 +37,12 @@ FAVICON_CANDIDATES = [
     os.path.join("assets", "icons", "reader4.jpg"),
 ]
 IGNORED_SCAN_DIRS = {".git", ".venv", "__pycache__", "assets", "templates"}
+# Resolved once; safe_book_dir runs on every reader and image request.
+_ROOT_ABS = os.path.abspath(BOOKS_DIR)
+_ROOT_PREFIX = _ROOT_ABS if _ROOT_ABS.endswith(os.sep) else _ROOT_ABS + os.sep
+
+# (latest directory mtime, books, grouped_books, category_options) from the last library scan.
+_library_cache: Optional[Tuple[float, list, dict, list]] = None
 
 
 @app.get("/favicon.ico", include_in_schema=False)
@@ -51,18 +71,30 @@ def safe_book_dir(book_id: str) -> Optional[str]:
     if os.path.isabs(rel) or rel.startswith("..") or f"{os.sep}..{os.sep}" in rel:
         return None
 
-    root_abs = os.path.abspath(BOOKS_DIR)
-    full_path = os.path.abspath(os.path.join(root_abs, rel))
-    if os.path.commonpath([root_abs, full_path]) != root_abs:
+    full_path = os.path.abspath(os.path.join(_ROOT_ABS, rel))
+    if full_path != _ROOT_ABS and not full_path.startswith(_ROOT_PREFIX):
         return None
     return full_path
 
 
-@lru_cache(maxsize=10)
-def load_book_cached(folder_name: str) -> Optional[Book]:
+def book_file_stamp(folder_name: str) -> Optional[Tuple[int, int]]:
+    """
+    Returns (mtime_ns, size) of the book's book.pkl, or None if it doesn't exist.
+    Reprocessing a book replaces book.pkl, which changes the stamp.
+    """
+    book_dir = safe_book_dir(folder_name)
+    if not book_dir:
+        return None
+    try:
+        st = os.stat(os.path.join(book_dir, "book.pkl"))
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def load_book(folder_name: str) -> Optional[Book]:
     """
     Loads the book from the pickle file.
-    Cached so we don't re-read the disk on every click.
     """
     book_dir = safe_book_dir(folder_name)
     if not book_dir:
@@ -72,15 +104,150 @@ def load_book_cached(folder_name: str) -> Optional[Book]:
         return None
 
     try:
+        # Unpickle straight from a read-only mapping of the file so the page
+        # cache is used directly instead of being copied into a read buffer.
         with open(file_path, "rb") as f:
-            book = pickle.load(f)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                book = pickle.loads(mm)
         return book
     except Exception as e:
         print(f"Error loading book {folder_name}: {e}")
         return None
 
 
-def category_from_rel_path(rel_path: str) -> str:
+class BookCache:
+    """
+    LRU cache of loaded books, bounded by the total size of their book.pkl files
+    rather than by count. Entries remember book.pkl's (mtime_ns, size) and are
+    reloaded when it changes, so a reprocessed book never keeps a stale spine.
+    Cold loads take a per-book lock, so concurrent requests for the same book
+    share one unpickle; disk I/O never holds the cache lock. The routes call
+    into it through run_in_threadpool, which is what makes loads concurrent.
+    """
+
+    def __init__(self, max_bytes: int = 512 << 20):
+        self._max_bytes = max_bytes
+        # folder_name -> (book, (mtime_ns, size) of its book.pkl)
+        self._entries: "OrderedDict[str, Tuple[Book, Tuple[int, int]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+
+    def _lookup(self, folder_name: str, stamp: Tuple[int, int]) -> Optional[Book]:
+        # Caller holds self._lock. Drops the entry if book.pkl has changed.
+        entry = self._entries.get(folder_name)
+        if entry is None:
+            return None
+        if entry[1] != stamp:
+            del self._entries[folder_name]
+            self._bytes -= entry[1][1]
+            return None
+        self._entries.move_to_end(folder_name)
+        return entry[0]
+
+    def get(self, folder_name: str) -> Optional[Book]:
+        stamp = book_file_stamp(folder_name)
+        if stamp is None:
+            return None
+
+        with self._lock:
+            book = self._lookup(folder_name, stamp)
+            if book is not None:
+                return book
+            key_lock = self._locks.setdefault(folder_name, threading.Lock())
+
+        try:
+            with key_lock:
+                return self._load(folder_name, stamp)
+        finally:
+            # Only in-flight loads keep a lock, so the dict can't grow unbounded.
+            with self._lock:
+                if self._locks.get(folder_name) is key_lock:
+                    del self._locks[folder_name]
+
+    def _load(self, folder_name: str, stamp: Tuple[int, int]) -> Optional[Book]:
+        # Caller holds the per-book lock.
+        # Another request may have loaded it while we waited.
+        with self._lock:
+            book = self._lookup(folder_name, stamp)
+            if book is not None:
+                return book
+
+        book = load_book(folder_name)
+        if book is None:
+            return None
+
+        with self._lock:
+            old = self._entries.pop(folder_name, None)
+            if old is not None:
+                self._bytes -= old[1][1]
+            self._entries[folder_name] = (book, stamp)
+            self._bytes += stamp[1]
+            # Always keep the newest book, even if it alone exceeds the budget.
+            while self._bytes > self._max_bytes and len(self._entries) > 1:
+                _, (_, evicted_stamp) = self._entries.popitem(last=False)
+                self._bytes -= evicted_stamp[1]
+        return book
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._locks.clear()
+
+
+_book_cache = BookCache()
+
+
+def load_book_cached(folder_name: str) -> Optional[Book]:
+    """
+    Loads the book, cached so we don't re-read the disk on every click.
+    """
+    return _book_cache.get(folder_name)
+
+
+@lru_cache(maxsize=1024)
+def load_book_meta_cached(folder_name: str, mtime: float = 0.0) -> dict:
+    """
+    Reads title/authors/chapter count from the library.json sidecar.
+    The sidecar's mtime is part of the cache key so reprocessed books are re-read.
+    Raises OSError/ValueError if it is missing or unreadable; lru_cache doesn't
+    memoize exceptions, so failures are retried on the next call.
+    """
+    book_dir = safe_book_dir(folder_name)
+    if not book_dir:
+        raise FileNotFoundError(folder_name)
+    meta_path = os.path.join(book_dir, "library.json")
+    with open(meta_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_book_meta(folder_name: str, mtime: float = 0.0) -> Optional[dict]:
+    """
+    Library metadata for a book, via the cached sidecar when there is one.
+    Books processed before the sidecar existed get one generated from book.pkl.
+    """
+    try:
+        return load_book_meta_cached(folder_name, mtime)
+    except (OSError, ValueError):
+        pass
+
+    book_dir = safe_book_dir(folder_name)
+    book = load_book_cached(folder_name)
+    if not book_dir or not book:
+        return None
+    try:
+        return save_library_meta(book, book_dir)
+    except OSError:
+        return {
+            "title": book.metadata.title,
+            "authors": book.metadata.authors,
+            "chapters": len(book.spine),
+        }
+
+
+@lru_cache(maxsize=256)
+def category_from_rel_path(rel_path: str) -> Tuple[str, str]:
     parts = rel_path.split(os.sep)
     if len(parts) <= 1:
         return "", "Uncategorized"
@@ -98,33 +265,66 @@ def normalize_category_key(category: str) -> str:
         raise HTTPException(status_code=400, detail="Invalid category name")
     return normalized
 
-@app.get("/", response_class=HTMLResponse)
-async def library_view(request: Request):
-    """Lists all available processed books."""
-    books = []
-
-    # Scan directory tree for folders ending in '_data' that contain book.pkl
-    if os.path.exists(BOOKS_DIR):
-        for root, dirs, files in os.walk(BOOKS_DIR, topdown=True):
-            dirs[:] = [d for d in dirs if d not in IGNORED_SCAN_DIRS and not d.startswith(".")]
 
-            if os.path.basename(root).endswith("_data") and "book.pkl" in files:
-                rel_folder = os.path.relpath(root, BOOKS_DIR)
-                book = load_book_cached(encode_book_id(rel_folder))
-                if book:
-                    author = ", ".join(book.metadata.authors)
-                    books.append(
-                        {
-                            "id": encode_book_id(rel_folder),
-                            "title": book.metadata.title,
-                            "author": author,
-                            "chapters": len(book.spine),
-                            "category_key": category_from_rel_path(rel_folder)[0],
-                            "category": category_from_rel_path(rel_folder)[1],
-                        }
-                    )
-                # No need to descend further inside a _data directory.
-                dirs[:] = []
+def scan_tree(top: str):
+    """
+    Minimal os.walk replacement built on os.scandir.
+    Yields (root, dirs, files); ignored and hidden names are dropped before any
+    type check, and DirEntry.is_dir() is answered from the directory listing.
+    Callers may prune `dirs` in place to skip descending into them.
+    """
+    stack = [top]
+    while stack:
+        root = stack.pop()
+        dirs, files = [], []
+        try:
+            with os.scandir(root) as it:
+                for entry in it:
+                    name = entry.name
+                    if name in IGNORED_SCAN_DIRS or name.startswith("."):
+                        continue
+                    if entry.is_dir():
+                        # Like os.walk, don't follow directory symlinks.
+                        if not entry.is_symlink():
+                            dirs.append(name)
+                    else:
+                        files.append(name)
+        except OSError:
+            continue
+
+        yield root, dirs, files
+        stack.extend(os.path.join(root, d) for d in reversed(dirs))
+
+
+def build_library(book_dirs):
+    """
+    Builds the library listing from (root, has_sidecar) pairs of _data folders.
+    Returns (books, grouped_books, category_options).
+    """
+    books = []
+    for root, has_sidecar in book_dirs:
+        rel_folder = os.path.relpath(root, BOOKS_DIR)
+        mtime = 0.0
+        if has_sidecar:
+            try:
+                mtime = os.stat(os.path.join(root, "library.json")).st_mtime
+            except OSError:
+                pass
+        book_id = encode_book_id(rel_folder)
+        meta = load_book_meta(book_id, mtime)
+        if meta:
+            author = ", ".join(meta["authors"])
+            cat_key, cat_label = category_from_rel_path(rel_folder)
+            books.append(
+                {
+                    "id": book_id,
+                    "title": meta["title"],
+                    "author": author,
+                    "chapters": meta["chapters"],
+                    "category_key": cat_key,
+                    "category": cat_label,
+                }
+            )
 
     books = sorted(books, key=lambda x: x["title"].lower())
     grouped_books = {}
@@ -144,6 +344,36 @@ async def library_view(request: Request):
             category_options.append({"key": key, "label": label})
             known_keys.add(key)
 
+    return books, grouped_books, category_options
+
+
+@app.get("/", response_class=HTMLResponse)
+async def library_view(request: Request):
+    """Lists all available processed books."""
+    global _library_cache
+    book_dirs = []
+    latest_mtime = 0.0
+
+    # Scan directory tree for folders ending in '_data' that contain book.pkl.
+    # Adding, removing or reprocessing a book touches some scanned directory's
+    # mtime, so the newest one tells us whether the cached listing is stale.
+    if os.path.exists(BOOKS_DIR):
+        for root, dirs, files in scan_tree(BOOKS_DIR):
+            latest_mtime = max(latest_mtime, os.stat(root).st_mtime)
+
+            if os.path.basename(root).endswith("_data") and "book.pkl" in files:
+                book_dirs.append((root, "library.json" in files))
+                # No need to descend further inside a _data directory.
+                dirs[:] = []
+
+    if _library_cache is not None and _library_cache[0] == latest_mtime:
+        _, books, grouped_books, category_options = _library_cache
+    else:
+        books, grouped_books, category_options = await run_in_threadpool(
+            build_library, book_dirs
+        )
+        _library_cache = (latest_mtime, books, grouped_books, category_options)
+
     return templates.TemplateResponse(
         "library.html",
         {
@@ -157,6 +387,7 @@ async def library_view(request: Request):
 
 @app.get("/library/move")
 async def move_book_to_category(book_id: str, target: str):
+    global _library_cache
     src_dir = safe_book_dir(book_id)
     if not src_dir or not os.path.isdir(src_dir):
         raise HTTPException(status_code=404, detail="Book not found")
@@ -179,7 +410,9 @@ async def move_book_to_category(book_id: str, target: str):
                 detail=f"Destination already has '{base_name}'",
             )
         shutil.move(src_dir, dest_dir)
-        load_book_cached.cache_clear()
+        _book_cache.clear()
+        load_book_meta_cached.cache_clear()
+        _library_cache = None
 
     return RedirectResponse(url="/", status_code=303)
 
@@ -191,7 +424,8 @@ async def redirect_to_first_chapter(book_id: str):
 @app.get("/read/{book_id}/{chapter_index}", response_class=HTMLResponse)
 async def read_chapter(request: Request, book_id: str, chapter_index: int):
     """The main reader interface."""
-    book = load_book_cached(book_id)
+    # Disk reads/unpickling run off the event loop so other requests aren't blocked.
+    book = await run_in_threadpool(load_book_cached, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
@@ -199,6 +433,12 @@ async def read_chapter(request: Request, book_id: str, chapter_index: int):
         raise HTTPException(status_code=404, detail="Chapter not found")
 
     current_chapter = book.spine[chapter_index]
+    # None also covers a bodies.bin newer than this book.pkl (mid-reprocess).
+    chapter_body = await run_in_threadpool(
+        load_chapter_body, book, safe_book_dir(book_id), chapter_index
+    )
+    if chapter_body is None:
+        raise HTTPException(status_code=404, detail="Chapter not found")
 
     # Calculate Prev/Next links
     prev_idx = chapter_index - 1 if chapter_index > 0 else None
@@ -208,6 +448,7 @@ async def read_chapter(request: Request, book_id: str, chapter_index: int):
         "request": request,
         "book": book,
         "current_chapter": current_chapter,
+        "chapter_body": chapter_body,
         "chapter_index": chapter_index,
         "book_id": book_id,
         "prev_idx": prev_idx,